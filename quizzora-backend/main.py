@@ -1,11 +1,13 @@
 from fastapi import FastAPI, File, UploadFile, Form, Query, HTTPException, Depends, BackgroundTasks
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 import os
 import shutil
 import tempfile
 import subprocess
-import whisper
+import sys
+import signal
 import pdfplumber
 from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
 from pydantic import BaseModel
@@ -17,6 +19,8 @@ import concurrent.futures
 import hashlib
 import pickle
 import re
+import threading
+import zipfile
 
 
 from langchain_community.document_loaders import PyMuPDFLoader
@@ -37,15 +41,45 @@ app.add_middleware(
 
 
 TEMP_DIR = "temp_files"
-UPLOAD_FOLDER = "uploads"
 DB_PATH = "./chroma_db"
 CACHE_DIR = "./summary_cache"
+CHECKPOINT_DIR = "./checkpoints"
 os.makedirs(TEMP_DIR, exist_ok=True)
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(CACHE_DIR, exist_ok=True)
+os.makedirs(CHECKPOINT_DIR, exist_ok=True)
 
+# Scratch space limits: jobs wait for admission rather than filling the disk
+TEMP_DISK_QUOTA = int(os.environ.get("TEMP_DISK_QUOTA_MB", "10240")) * 1024 * 1024
+MIN_FREE_DISK = int(os.environ.get("MIN_FREE_DISK_MB", "2048")) * 1024 * 1024
+YOUTUBE_DISK_ESTIMATE = int(os.environ.get("YOUTUBE_DISK_ESTIMATE_MB", "2048")) * 1024 * 1024
+UPLOAD_ADMISSION_TIMEOUT = 30  # Seconds an upload request may wait for disk space
+AUDIO_BYTES_PER_SECOND = 16000 * 2  # Extracted audio is 16 kHz mono 16-bit PCM
+TEMP_MAX_AGE = 60 * 60  # Orphaned workspaces older than this are swept
+CHECKPOINT_MAX_AGE = 7 * 24 * 60 * 60  # Abandoned checkpoints older than this are swept
+SWEEP_INTERVAL = 10 * 60
 
-whisper_model = whisper.load_model("tiny")  
+# Vector store retention: 0 disables the corresponding limit
+SOURCE_INDEX_PATH = "./chroma_sources.pkl"
+VECTOR_TTL_DAYS = float(os.environ.get("VECTOR_TTL_DAYS", "0"))
+MAX_VECTOR_CHUNKS = int(os.environ.get("MAX_VECTOR_CHUNKS", "0"))
+MAINTENANCE_INTERVAL = 6 * 60 * 60
+
+PDF_EXTENSIONS = (".pdf",)
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a")
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi")
+SUPPORTED_EXTENSIONS = PDF_EXTENSIONS + AUDIO_EXTENSIONS + VIDEO_EXTENSIONS
+
+# Batch ingestion: files are extracted in parallel, chunks share model passes
+BATCH_EXTRACT_WORKERS = 4
+SUMMARY_BATCH_SIZE = 8
+EMBED_BATCH_SIZE = 64
+
+
+# Whisper runs in its own process per transcription so a cancelled task can kill it.
+# Each process loads its own model, and only a few run at once to share the CPU.
+WHISPER_MODEL = "tiny"
+TRANSCRIBE_WORKERS = int(os.environ.get("TRANSCRIBE_WORKERS", "2"))
+transcription_slots = threading.BoundedSemaphore(TRANSCRIBE_WORKERS)
 
 
 try:
@@ -66,8 +100,24 @@ processing_status = {}
 embedding_model = OllamaEmbeddings(model="nomic-embed-text")
 vector_store = Chroma(persist_directory=DB_PATH, embedding_function=embedding_model)
 
-if os.path.exists(DB_PATH) and len(vector_store.get()["documents"]) > 0:
-    print("✅ ChromaDB already has stored embeddings. Skipping re-processing.")
+# Per-document bookkeeping (chunk counts, timestamps) used for retention and stats.
+# Documents are keyed by content hash, so files sharing a name stay separate.
+source_index = {}
+source_index_lock = threading.Lock()
+maintenance_lock = threading.Lock()
+source_index_loaded = False
+if os.path.exists(SOURCE_INDEX_PATH):
+    try:
+        with open(SOURCE_INDEX_PATH, 'rb') as f:
+            source_index = pickle.load(f)
+        source_index_loaded = True
+    except Exception as e:
+        print(f"Source index read error: {e}")
+
+# count() is answered from the collection metadata, unlike get() which loads every document
+stored_chunks = vector_store._collection.count()
+if stored_chunks > 0:
+    print(f"✅ ChromaDB already has {stored_chunks} stored chunks. Skipping re-processing.")
 else:
     print("No existing embeddings found in ChromaDB. New data will be added.")
 
@@ -82,16 +132,26 @@ class StatusResponse(BaseModel):
     status: str
     progress: float
     details: str
+
+
+class TaskCancelled(Exception):
+    """Raised inside a background job once the client has cancelled it"""
+    pass
     
 
 def get_file_hash(file_path):
     """Generate a hash of the file content for caching purposes"""
-    h = hashlib.md5()
     with open(file_path, 'rb') as file:
-        chunk = 0
-        while chunk != b'':
-            chunk = file.read(1024 * 1024)  # Read 1MB at a time
-            h.update(chunk)
+        return get_stream_hash(file)
+
+def get_stream_hash(stream):
+    """Hash an open binary stream, leaving it rewound for the next reader"""
+    h = hashlib.md5()
+    chunk = 0
+    while chunk != b'':
+        chunk = stream.read(1024 * 1024)  # Read 1MB at a time
+        h.update(chunk)
+    stream.seek(0)
     return h.hexdigest()
 
 def check_cache(file_hash, operation="summary"):
@@ -114,6 +174,223 @@ def save_to_cache(file_hash, data, operation="summary"):
     except Exception as e:
         print(f"Cache write error: {e}")
 
+def clear_cache(file_hash, operation="summary"):
+    """Drop a cached result so the file gets fully processed again"""
+    cache_path = os.path.join(CACHE_DIR, f"{file_hash}_{operation}.pkl")
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+# Checkpointing and cancellation for long-running jobs.
+# The transcript lives in its own file, written once, so the frequent
+# progress saves only rewrite the small pickle.
+def load_checkpoint(job_key):
+    """Load the saved progress of a job, or start a fresh checkpoint"""
+    checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{job_key}.pkl")
+    transcript_path = os.path.join(CHECKPOINT_DIR, f"{job_key}.txt")
+    checkpoint = {
+        "job_key": job_key,
+        "transcript": None,
+        "chunk_summaries": {}
+    }
+    try:
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, 'rb') as f:
+                checkpoint.update(pickle.load(f))
+        if os.path.exists(transcript_path):
+            with open(transcript_path, 'r', encoding='utf-8') as f:
+                checkpoint["transcript"] = f.read()
+    except Exception as e:
+        print(f"Checkpoint read error: {e}")
+    return checkpoint
+
+def save_checkpoint(checkpoint):
+    """Persist job progress atomically so a crash never leaves a torn checkpoint"""
+    job_key = checkpoint["job_key"]
+    transcript_path = os.path.join(CHECKPOINT_DIR, f"{job_key}.txt")
+    checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{job_key}.pkl")
+    try:
+        if checkpoint["transcript"] and not os.path.exists(transcript_path):
+            with open(transcript_path + ".tmp", 'w', encoding='utf-8') as f:
+                f.write(checkpoint["transcript"])
+            os.replace(transcript_path + ".tmp", transcript_path)
+        
+        progress = {key: value for key, value in checkpoint.items() if key != "transcript"}
+        with open(checkpoint_path + ".tmp", 'wb') as f:
+            pickle.dump(progress, f)
+        os.replace(checkpoint_path + ".tmp", checkpoint_path)
+    except Exception as e:
+        print(f"Checkpoint write error: {e}")
+
+def clear_checkpoint(job_key):
+    """Remove the checkpoint of a job that has finished successfully"""
+    for extension in (".pkl", ".txt"):
+        checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{job_key}{extension}")
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+def is_cancelled(task_id):
+    # Per-file subtasks of a batch are cancelled together with their batch
+    status_data = processing_status.get(task_id, {}) if task_id else {}
+    if status_data.get("cancelled", False):
+        return True
+    return "parent" in status_data and is_cancelled(status_data["parent"])
+
+def check_cancelled(task_id):
+    """Cooperative cancellation point for background jobs"""
+    if is_cancelled(task_id):
+        raise TaskCancelled()
+
+# Scratch space management: per-task workspaces, disk admission and sweeping
+disk_condition = threading.Condition()
+disk_reservations = {}
+
+def create_task_workspace(task_id):
+    """Create a private scratch directory for a task"""
+    workspace = os.path.join(TEMP_DIR, task_id)
+    os.makedirs(workspace, exist_ok=True)
+    return workspace
+
+def remove_task_workspace(task_id):
+    """Delete a task's scratch directory and everything in it"""
+    shutil.rmtree(os.path.join(TEMP_DIR, task_id), ignore_errors=True)
+
+def reserve_disk(task_id, nbytes, timeout=None):
+    """Block until the scratch quota and the free disk space can take nbytes more for this task"""
+    deadline = time.time() + timeout if timeout is not None else None
+    with disk_condition:
+        while True:
+            current = disk_reservations.get(task_id, 0)
+            reserved = sum(disk_reservations.values()) - current
+            # Reserved bytes may not be written yet, so free space alone overstates the room
+            free = shutil.disk_usage(TEMP_DIR).free - reserved
+            # An oversized job is still admitted once it has the quota to itself,
+            # but free space is always checked against the real size
+            within_quota = reserved + min(current + nbytes, TEMP_DISK_QUOTA) <= TEMP_DISK_QUOTA
+            if within_quota and free - nbytes >= MIN_FREE_DISK:
+                break
+            if not any(other != task_id for other in disk_reservations):
+                # Nothing running here will free space, so waiting cannot help
+                raise Exception("Not enough free disk space to process this file")
+            if deadline is not None and time.time() >= deadline:
+                raise Exception("Timed out waiting for disk space")
+            update_status(task_id, 0.0, "Waiting for disk space")
+            disk_condition.wait(timeout=5)
+            check_cancelled(task_id)
+        disk_reservations[task_id] = current + nbytes
+
+def get_media_duration(media_file):
+    """Duration of an audio or video file in seconds, or None if ffprobe can't tell"""
+    try:
+        process = subprocess.run(
+            f'ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "{media_file}"',
+            shell=True,
+            check=True,
+            capture_output=True,
+            text=True
+        )
+        return float(process.stdout.strip())
+    except (subprocess.CalledProcessError, ValueError) as e:
+        print(f"ffprobe could not read duration of {media_file}: {e}")
+        return None
+
+def has_extension(file_name, extensions):
+    """Case-insensitive extension check, so Lecture.PDF counts as a PDF"""
+    return file_name.lower().endswith(extensions)
+
+def estimate_derived_bytes(file_path, file_name):
+    """Scratch space processing a file writes; only videos produce a large derived file"""
+    if not has_extension(file_name, VIDEO_EXTENSIONS):
+        return 0
+    duration = get_media_duration(file_path)
+    if duration is None:
+        # Without a duration, fall back to assuming the audio is as large as the video
+        return os.path.getsize(file_path)
+    return int(duration * AUDIO_BYTES_PER_SECOND)
+
+def get_upload_size(upload):
+    """Size of an uploaded file as spooled by the server, without reading it"""
+    if upload.size is not None:
+        return upload.size
+    upload.file.seek(0, os.SEEK_END)
+    size = upload.file.tell()
+    upload.file.seek(0)
+    return size
+
+def release_disk(task_id):
+    """Return a task's disk reservation and wake up waiting tasks"""
+    with disk_condition:
+        if disk_reservations.pop(task_id, None) is not None:
+            disk_condition.notify_all()
+
+def sweep_orphans():
+    """Remove scratch files and checkpoints that no running task owns"""
+    now = time.time()
+    active = {task_id for task_id, data in list(processing_status.items()) if not data.get("completed", False)}
+    
+    for entry in os.listdir(TEMP_DIR):
+        path = os.path.join(TEMP_DIR, entry)
+        try:
+            if entry in active or now - os.path.getmtime(path) < TEMP_MAX_AGE:
+                continue
+            print(f"Sweeping orphaned scratch entry: {path}")
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+        except OSError as e:
+            print(f"Sweep error for {path}: {e}")
+    
+    for entry in os.listdir(CHECKPOINT_DIR):
+        path = os.path.join(CHECKPOINT_DIR, entry)
+        try:
+            if now - os.path.getmtime(path) >= CHECKPOINT_MAX_AGE:
+                print(f"Sweeping stale checkpoint: {path}")
+                os.remove(path)
+        except OSError as e:
+            print(f"Sweep error for {path}: {e}")
+
+def run_sweeper():
+    while True:
+        try:
+            sweep_orphans()
+        except Exception as e:
+            print(f"Sweeper error: {e}")
+        time.sleep(SWEEP_INTERVAL)
+
+def record_chunk_summaries(task_id, checkpoint, chunk_summaries):
+    """Checkpoint finished chunk summaries and expose them as a partial result"""
+    if checkpoint is not None:
+        save_checkpoint(checkpoint)
+    if task_id in processing_status:
+        processing_status[task_id]["partial_summary"] = " ".join(
+            chunk_summaries[i] for i in sorted(chunk_summaries) if chunk_summaries[i]
+        )
+
+def run_cancellable(command, task_id=None, poll_interval=1.0):
+    """Run a shell command, killing it if the task gets cancelled meanwhile"""
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True
+    )
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=poll_interval)
+            break
+        except subprocess.TimeoutExpired:
+            if is_cancelled(task_id):
+                # Kill the whole process group, not just the wrapping shell
+                os.killpg(process.pid, signal.SIGKILL)
+                process.communicate()
+                raise TaskCancelled()
+    
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
 # Core processing functions for content extraction
 def extract_text_from_pdf(pdf_path, task_id=None):
     """Extract text from PDF with support for progress tracking"""
@@ -138,6 +415,8 @@ def extract_text_from_pdf(pdf_path, task_id=None):
             
         text = "\n\n".join([doc.page_content for doc in documents])
         return text.strip()
+    except TaskCancelled:
+        raise
     except Exception as e:
         print(f"Error using PyMuPDFLoader: {str(e)}. Falling back to pdfplumber.")
         # Fallback to pdfplumber
@@ -146,6 +425,7 @@ def extract_text_from_pdf(pdf_path, task_id=None):
             total_pages = len(pdf.pages)
             
             for i, page in enumerate(pdf.pages):
+                check_cancelled(task_id)
                 page_text = page.extract_text() or ""
                 text += page_text + "\n"
                 
@@ -187,6 +467,7 @@ def extract_key_sections_from_pdf(pdf_path, task_id=None):
         sample_indices = [i for i in range(0, total_pages, max(1, total_pages // 100))]
         
         for i in sample_indices:
+            check_cancelled(task_id)
             text = pdf.pages[i].extract_text() or ""
             if chapter_pattern.search(text):
                 chapter_pages.append(i)
@@ -205,6 +486,7 @@ def extract_key_sections_from_pdf(pdf_path, task_id=None):
         # Extract the selected pages
         pages_to_extract = sorted(list(pages_to_extract))
         for i, page_num in enumerate(pages_to_extract):
+            check_cancelled(task_id)
             text = pdf.pages[page_num].extract_text() or ""
             if page_num >= total_pages - 15:
                 conclusion_text += text + "\n"
@@ -221,47 +503,44 @@ def extract_key_sections_from_pdf(pdf_path, task_id=None):
         
         return combined_text
 
-def download_youtube_video(youtube_url):
+def download_youtube_video(youtube_url, task_id=None, output_dir=TEMP_DIR, max_filesize=None):
     """Download YouTube video with better error handling"""
     try:
-        video_filename = os.path.join(TEMP_DIR, f"downloaded_video_{uuid.uuid4()}.mp4")
+        video_filename = os.path.join(output_dir, f"downloaded_video_{uuid.uuid4()}.mp4")
         command = f'yt-dlp -f "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]" -o "{video_filename}" {youtube_url}'
+        if max_filesize:
+            # yt-dlp skips, rather than truncates, any stream above the limit
+            command += f' --max-filesize {max_filesize}'
         
-        # Run yt-dlp with output capturing
-        process = subprocess.run(
-            command,
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
-        )
+        # Run yt-dlp with output capturing, aborting if the task is cancelled
+        run_cancellable(command, task_id)
         
         if not os.path.exists(video_filename):
-            raise Exception("Video download failed: output file not created")
+            raise Exception("Video download failed: output file not created (the video may exceed the size limit)")
             
         return video_filename
     except subprocess.CalledProcessError as e:
         print(f"yt-dlp error output: {e.stderr}")
         raise Exception(f"Failed to download video: {e.stderr}")
+    except TaskCancelled:
+        raise
     except Exception as e:
         print(f"Error downloading video: {str(e)}")
         raise
 
-def extract_audio(video_file):
+def extract_audio(video_file, task_id=None, output_dir=TEMP_DIR):
     """Extract audio from video file with better error handling"""
     try:
         if not os.path.exists(video_file):
             raise Exception(f"Video file not found: {video_file}")
             
-        audio_file = os.path.join(TEMP_DIR, f"extracted_audio_{uuid.uuid4()}.wav")
+        audio_file = os.path.join(output_dir, f"extracted_audio_{uuid.uuid4()}.wav")
         
-        # Run ffmpeg with output capturing
-        process = subprocess.run(
-            f'ffmpeg -i "{video_file}" -acodec pcm_s16le -ar 44100 "{audio_file}" -y',
-            shell=True,
-            check=True,
-            capture_output=True,
-            text=True
+        # Whisper resamples to 16 kHz mono anyway, so extract exactly that.
+        # Run ffmpeg with output capturing, aborting if the task is cancelled
+        run_cancellable(
+            f'ffmpeg -i "{video_file}" -acodec pcm_s16le -ac 1 -ar 16000 "{audio_file}" -y',
+            task_id
         )
         
         if not os.path.exists(audio_file):
@@ -271,12 +550,39 @@ def extract_audio(video_file):
     except subprocess.CalledProcessError as e:
         print(f"FFmpeg error output: {e.stderr}")
         raise Exception(f"FFmpeg error: {e.stderr}")
+    except TaskCancelled:
+        raise
     except Exception as e:
         print(f"Error extracting audio: {str(e)}")
         raise
 
-def transcribe_audio(audio_file):
-    return whisper_model.transcribe(audio_file)["text"]
+def transcribe_audio(audio_file, task_id=None):
+    """Transcribe audio with the Whisper CLI in a subprocess that cancellation can kill"""
+    output_dir = os.path.dirname(audio_file) or "."
+    threads = max(1, (os.cpu_count() or 1) // TRANSCRIBE_WORKERS)
+    while not transcription_slots.acquire(timeout=1):
+        check_cancelled(task_id)
+    try:
+        result = run_cancellable(
+            f'"{sys.executable}" -m whisper "{audio_file}" --model {WHISPER_MODEL} '
+            f'--output_format txt --output_dir "{output_dir}" --threads {threads} --verbose False',
+            task_id
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"Whisper error output: {e.stderr}")
+        raise Exception(f"Whisper error: {e.stderr}")
+    finally:
+        transcription_slots.release()
+    
+    # The Whisper CLI reports per-file failures and still exits 0, leaving no output
+    transcript_path = os.path.join(output_dir, os.path.splitext(os.path.basename(audio_file))[0] + ".txt")
+    if not os.path.exists(transcript_path):
+        print(f"Whisper output: {result.stdout}\n{result.stderr}")
+        raise Exception(f"Whisper error: {(result.stderr or result.stdout).strip()}")
+    with open(transcript_path, 'r', encoding='utf-8') as f:
+        transcript = " ".join(line.strip() for line in f if line.strip())
+    os.remove(transcript_path)
+    return transcript
 
 def update_status(task_id, progress, details):
     """Update the status of a processing task"""
@@ -284,6 +590,14 @@ def update_status(task_id, progress, details):
         processing_status[task_id]["progress"] = progress
         processing_status[task_id]["details"] = details
         print(f"Task {task_id}: {progress*100:.1f}% - {details}")
+        
+        # A batch subtask also reports into its file's entry of the batch
+        status = processing_status[task_id]
+        parent = processing_status.get(status.get("parent"), {})
+        file_entry = parent.get("files", {}).get(status.get("file_key"))
+        if file_entry is not None:
+            file_entry["progress"] = progress
+            file_entry["details"] = details
 
 def summarize_chunk(chunk):
     """Summarize a single chunk of text"""
@@ -296,44 +610,100 @@ def summarize_chunk(chunk):
         # Return a shortened version of the chunk if summarization fails
         return chunk[:200] + "..."
 
-def process_chunks_parallel(chunks, max_workers=4):
+def process_chunks_parallel(chunks, max_workers=4, task_id=None, checkpoint=None):
     """Process chunks in parallel for faster summarization"""
-    summaries = []
+    # Chunks already summarized in a previous run are not submitted again
+    summaries = checkpoint["chunk_summaries"] if checkpoint else {}
     with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
         # Submit tasks
-        future_to_chunk = {executor.submit(summarize_chunk, chunk): i for i, chunk in enumerate(chunks)}
+        future_to_chunk = {
+            executor.submit(summarize_chunk, chunk): i
+            for i, chunk in enumerate(chunks) if i not in summaries
+        }
         
         # Collect results as they complete
         for future in concurrent.futures.as_completed(future_to_chunk):
             chunk_idx = future_to_chunk[future]
             try:
-                summary = future.result()
-                if summary:
-                    summaries.append((chunk_idx, summary))
+                summaries[chunk_idx] = future.result()
+                record_chunk_summaries(task_id, checkpoint, summaries)
             except Exception as e:
                 print(f"Chunk {chunk_idx} processing error: {str(e)}")
+            
+            if task_id:
+                progress = 0.6 + (len(summaries) / len(chunks) * 0.3)
+                update_status(task_id, progress, f"Summarized {len(summaries)}/{len(chunks)} chunks")
+            
+            if is_cancelled(task_id):
+                # Drop queued chunks; only the ones already running are waited for
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise TaskCancelled()
     
     # Sort summaries by original chunk index
-    summaries.sort(key=lambda x: x[0])
-    return [summary for _, summary in summaries]
+    return [summaries[i] for i in sorted(summaries) if summaries[i]]
 
-def summarize_large_document_optimized(text, task_id=None, chunk_size=2000):
+def summarize_large_document_optimized(text, task_id=None, chunk_size=2000, checkpoint=None):
     """
     Optimized hierarchical summarization for large documents.
-    Uses parallel processing and smarter chunking.
+    Uses parallel processing and smarter chunking. When a checkpoint is
+    given, chunk summaries from an earlier run are reused and new ones are
+    saved as they finish.
     """
     start_time = time.time()
     
     if task_id:
         update_status(task_id, 0.5, "Starting document summarization")
     
+    chunks = split_for_summary(text, chunk_size)
+    
+    if task_id:
+        update_status(task_id, 0.6, f"Processing {len(chunks)} chunks")
+    
+    done_summaries = checkpoint["chunk_summaries"] if checkpoint else {}
+    if done_summaries:
+        print(f"Resuming summarization with {len(done_summaries)}/{len(chunks)} chunks already done")
+        record_chunk_summaries(task_id, None, done_summaries)
+    
+    # First level: Summarize chunks in parallel
+    use_parallel = len(chunks) > 10  # Only use parallel for larger documents
+    
+    if use_parallel:
+        chunk_summaries = process_chunks_parallel(chunks, task_id=task_id, checkpoint=checkpoint)
+    else:
+        for i, chunk in enumerate(chunks):
+            if i in done_summaries:
+                continue
+            check_cancelled(task_id)
+            done_summaries[i] = summarize_chunk(chunk)
+            record_chunk_summaries(task_id, checkpoint, done_summaries)
+            
+            if task_id and i % 5 == 0:
+                progress = 0.6 + (i / len(chunks) * 0.3)
+                update_status(task_id, progress, f"Summarized {i}/{len(chunks)} chunks")
+        
+        chunk_summaries = [done_summaries[i] for i in sorted(done_summaries) if done_summaries[i]]
+    
+    # Second level: Combine and re-summarize
+    final_summary = combine_chunk_summaries(chunk_summaries, task_id, chunk_size)
+    
+    if task_id:
+        update_status(task_id, 1.0, "Summarization completed")
+        
+    print(f"Summarization completed in {time.time() - start_time:.2f} seconds")
+    print(f"Final summary word count: {len(final_summary.split())}")
+    return final_summary
+
+def get_summary_splitter(chunk_size=2000):
     # Use RecursiveCharacterTextSplitter for smarter chunking
-    text_splitter = RecursiveCharacterTextSplitter(
+    return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size, 
         chunk_overlap=150,
         separators=["\n\n", "\n", ". ", " ", ""]
     )
-    chunks = text_splitter.split_text(text)
+
+def split_for_summary(text, chunk_size=2000):
+    """Split a document into the chunks that get summarized"""
+    chunks = get_summary_splitter(chunk_size).split_text(text)
     
     # Skip very large documents processing beyond a certain point
     if len(chunks) > 300:
@@ -351,35 +721,14 @@ def summarize_large_document_optimized(text, task_id=None, chunk_size=2000):
         chunks = key_chunks
     
     print(f"Document split into {len(chunks)} chunks for summarization")
-    
-    if task_id:
-        update_status(task_id, 0.6, f"Processing {len(chunks)} chunks")
-    
-    # First level: Summarize chunks in parallel
-    use_parallel = len(chunks) > 10  # Only use parallel for larger documents
-    
-    if use_parallel:
-        chunk_summaries = process_chunks_parallel(chunks)
-    else:
-        chunk_summaries = []
-        for i, chunk in enumerate(chunks):
-            chunk_summary = summarize_chunk(chunk)
-            if chunk_summary:
-                chunk_summaries.append(chunk_summary)
-            
-            if task_id and i % 5 == 0:
-                progress = 0.6 + (i / len(chunks) * 0.3)
-                update_status(task_id, progress, f"Summarized {i}/{len(chunks)} chunks")
-    
+    return chunks
+
+def combine_chunk_summaries(chunk_summaries, task_id=None, chunk_size=2000):
+    """Turn first-level chunk summaries into the final document summary"""
     # If we have only a few summaries, just combine them
     if len(chunk_summaries) <= 5:
-        final_summary = " ".join(chunk_summaries)
-        if task_id:
-            update_status(task_id, 1.0, "Summarization completed")
-        print(f"Summarization completed in {time.time() - start_time:.2f} seconds")
-        return final_summary
+        return " ".join(chunk_summaries)
     
-    # Second level: Combine and re-summarize
     if task_id:
         update_status(task_id, 0.9, "Creating final summary")
         
@@ -389,35 +738,254 @@ def summarize_large_document_optimized(text, task_id=None, chunk_size=2000):
     # Re-chunk and summarize at second level if needed
     if len(combined_text.split()) > 1000:
         # Split into larger chunks for second level
-        second_chunks = text_splitter.split_text(combined_text)
+        second_chunks = get_summary_splitter(chunk_size).split_text(combined_text)
         second_summaries = []
         
         for chunk in second_chunks:
+            check_cancelled(task_id)
             summary = summarize_chunk(chunk)
             if summary:
                 second_summaries.append(summary)
                 
-        final_summary = " ".join(second_summaries)
-    else:
-        final_summary = combined_text
-    
-    if task_id:
-        update_status(task_id, 1.0, "Summarization completed")
-        
-    print(f"Summarization completed in {time.time() - start_time:.2f} seconds")
-    print(f"Final summary word count: {len(final_summary.split())}")
-    return final_summary
+        return " ".join(second_summaries)
+    return combined_text
+
+def summarize_chunk_batch(chunks):
+    """Summarize several chunks in one pipeline call so the model runs full batches"""
+    summaries = [""] * len(chunks)
+    to_summarize = [i for i, chunk in enumerate(chunks) if len(chunk) >= 100]  # Skip very small chunks
+    if not to_summarize:
+        return summaries
+    try:
+        outputs = summarizer(
+            [chunks[i] for i in to_summarize],
+            max_length=150,
+            min_length=30,
+            do_sample=False,
+            batch_size=len(to_summarize)
+        )
+        for i, output in zip(to_summarize, outputs):
+            summaries[i] = output['summary_text']
+    except Exception as e:
+        print(f"Error summarizing chunk batch: {str(e)}. Falling back to single chunks.")
+        for i in to_summarize:
+            summaries[i] = summarize_chunk(chunks[i])
+    return summaries
 
-def store_in_chroma(text, source="unknown"):
+def store_in_chroma(text, doc_id, source="unknown", task_id=None, batch_size=64):
     # Split the text into chunks
+    chunks = split_for_embedding(text)
+    
+    # Store in ChromaDB in batches. Chunk IDs are content-derived, so chunks
+    # already embedded by a previous run are skipped by add_chunk_batch.
+    added = 0
+    for i in range(0, len(chunks), batch_size):
+        check_cancelled(task_id)
+        added += sum(add_chunk_batch([(doc_id, source, chunk) for chunk in chunks[i:i + batch_size]]).values())
+    vector_store.persist()
+    register_source(doc_id, source, added)
+    print(f"Stored {added}/{len(chunks)} new chunks in ChromaDB from source: {source}")
+    
+    # Keep the corpus within its size bound, never evicting what was just added
+    apply_retention(protect={doc_id})
+
+def split_for_embedding(text):
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=100)
-    chunks = text_splitter.split_text(text)
+    return text_splitter.split_text(text)
+
+def add_chunk_batch(items):
+    """Embed and store (doc_id, source, chunk) triples in one call, returning new chunk counts per document"""
+    batch = {get_chunk_id(doc_id, chunk): (doc_id, source, chunk) for doc_id, source, chunk in items}
     
-    # Store in ChromaDB
-    metadatas = [{"source": source} for _ in chunks]
-    vector_store.add_texts(texts=chunks, metadatas=metadatas)
+    # Content-derived IDs let re-uploads skip chunks that are already stored
+    existing = set(vector_store.get(ids=list(batch), include=[])["ids"])
+    new_ids = [chunk_id for chunk_id in batch if chunk_id not in existing]
+    added = {}
+    if new_ids:
+        vector_store.add_texts(
+            texts=[batch[chunk_id][2] for chunk_id in new_ids],
+            metadatas=[{"source": batch[chunk_id][1], "doc_id": batch[chunk_id][0]} for chunk_id in new_ids],
+            ids=new_ids
+        )
+        for chunk_id in new_ids:
+            doc_id = batch[chunk_id][0]
+            added[doc_id] = added.get(doc_id, 0) + 1
+    return added
+
+# Vector store maintenance: per-document deletion, retention and compaction
+def get_chunk_id(doc_id, chunk):
+    return hashlib.md5(f"{doc_id}\n{chunk}".encode()).hexdigest()
+
+def get_doc_id(metadata):
+    """Document a stored chunk belongs to; chunks stored before documents had IDs are grouped by name"""
+    metadata = metadata or {}
+    return metadata.get("doc_id") or legacy_doc_id(metadata.get("source", "unknown"))
+
+def legacy_doc_id(source):
+    return "legacy_" + hashlib.md5(source.encode()).hexdigest()
+
+def migrate_source_index():
+    """Re-key an index written when sources were keyed by file name; callers must hold source_index_lock"""
+    for source in [key for key, entry in source_index.items() if "source" not in entry]:
+        entry = source_index.pop(source)
+        entry["source"] = source
+        entry["legacy"] = True
+        source_index[legacy_doc_id(source)] = entry
+
+def save_source_index():
+    """Persist the source index; callers must hold source_index_lock"""
+    try:
+        with open(SOURCE_INDEX_PATH, 'wb') as f:
+            pickle.dump(source_index, f)
+    except Exception as e:
+        print(f"Source index write error: {e}")
+
+def register_source(doc_id, source, added_chunks):
+    """Record that chunks were stored for a document"""
+    now = time.time()
+    with source_index_lock:
+        entry = source_index.setdefault(doc_id, {"source": source, "chunks": 0, "added_at": now, "last_used": now})
+        entry["chunks"] += added_chunks
+        entry["last_used"] = now
+        entry["ingested_at"] = now
+        save_source_index()
+
+def touch_sources(doc_ids):
+    """Mark documents as recently used so LRU retention keeps them"""
+    now = time.time()
+    with source_index_lock:
+        for doc_id in doc_ids:
+            if doc_id in source_index:
+                source_index[doc_id]["last_used"] = now
+        save_source_index()
+
+def delete_source(doc_id):
+    """Delete every vector stored for a document and return how many were removed"""
+    with source_index_lock:
+        entry = source_index.get(doc_id, {})
+    if entry.get("legacy"):
+        # Legacy chunks carry only the file name, which newer documents may share
+        page = vector_store.get(where={"source": entry["source"]}, include=["metadatas"])
+        ids = [
+            chunk_id for chunk_id, metadata in zip(page["ids"], page["metadatas"])
+            if not (metadata or {}).get("doc_id")
+        ]
+    else:
+        ids = vector_store.get(where={"doc_id": doc_id}, include=[])["ids"]
+    for i in range(0, len(ids), EMBED_BATCH_SIZE):
+        vector_store.delete(ids=ids[i:i + EMBED_BATCH_SIZE])
     vector_store.persist()
-    print(f"Stored {len(chunks)} chunks in ChromaDB from source: {source}")
+    with source_index_lock:
+        source_index.pop(doc_id, None)
+        save_source_index()
+    
+    # Without this, re-uploading the file would hit the summary cache and never re-embed.
+    # File documents are keyed by the file hash the summary is cached under.
+    for file_hash in entry.get("file_hashes", {doc_id}):
+        clear_cache(file_hash)
+    print(f"Deleted {len(ids)} chunks from ChromaDB for source: {entry.get('source', doc_id)}")
+    return len(ids)
+
+def apply_retention(protect=()):
+    """Evict expired sources, then least recently used ones while over the size bound"""
+    with source_index_lock:
+        by_last_used = sorted(source_index.items(), key=lambda item: item[1]["last_used"])
+    
+    removed = []
+    if VECTOR_TTL_DAYS > 0:
+        cutoff = time.time() - VECTOR_TTL_DAYS * 24 * 60 * 60
+        for doc_id, entry in by_last_used:
+            if doc_id not in protect and entry["last_used"] < cutoff:
+                delete_source(doc_id)
+                removed.append(doc_id)
+    
+    if MAX_VECTOR_CHUNKS > 0:
+        for doc_id, entry in by_last_used:
+            if vector_store._collection.count() <= MAX_VECTOR_CHUNKS:
+                break
+            if doc_id not in protect and doc_id not in removed:
+                delete_source(doc_id)
+                removed.append(doc_id)
+    
+    return removed
+
+def compact_vector_store(page_size=1000):
+    """
+    Remove duplicate chunks and reconcile the source index with a paged scan.
+    Runs in the background; a scan already in progress makes this a no-op.
+    """
+    if not maintenance_lock.acquire(blocking=False):
+        print("Vector store maintenance already running, skipping")
+        return
+    try:
+        start_time = time.time()
+        seen = set()
+        duplicate_ids = []
+        doc_counts = {}
+        doc_names = {}
+        
+        offset = 0
+        while True:
+            page = vector_store.get(
+                include=["documents", "metadatas"],
+                limit=page_size,
+                offset=offset
+            )
+            if not page["ids"]:
+                break
+            for chunk_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                doc_id = get_doc_id(metadata)
+                key = get_chunk_id(doc_id, document)
+                if key in seen:
+                    duplicate_ids.append(chunk_id)
+                else:
+                    seen.add(key)
+                    doc_counts[doc_id] = doc_counts.get(doc_id, 0) + 1
+                    doc_names[doc_id] = (metadata or {}).get("source", "unknown")
+            offset += len(page["ids"])
+        
+        for i in range(0, len(duplicate_ids), page_size):
+            vector_store.delete(ids=duplicate_ids[i:i + page_size])
+        vector_store.persist()
+        
+        # Documents stored before the index existed are adopted; vanished ones are dropped.
+        # Documents ingested during the scan keep the counts register_source gave them.
+        with source_index_lock:
+            for doc_id, count in doc_counts.items():
+                entry = source_index.setdefault(
+                    doc_id,
+                    {"source": doc_names[doc_id], "chunks": 0, "added_at": start_time, "last_used": start_time}
+                )
+                if doc_id.startswith("legacy_"):
+                    entry["legacy"] = True
+                if entry.get("ingested_at", entry["added_at"]) <= start_time:
+                    entry["chunks"] = count
+            for doc_id in list(source_index):
+                entry = source_index[doc_id]
+                if doc_id not in doc_counts and entry.get("ingested_at", entry["added_at"]) < start_time:
+                    del source_index[doc_id]
+            save_source_index()
+        
+        evicted = apply_retention()
+        print(
+            f"Vector store compaction removed {len(duplicate_ids)} duplicates and "
+            f"{len(evicted)} sources in {time.time() - start_time:.2f} seconds"
+        )
+    finally:
+        maintenance_lock.release()
+
+def run_vector_maintenance():
+    # A full scan is only urgent when chunks exist that the index knows nothing about
+    with source_index_lock:
+        index_missing = not source_index_loaded or not source_index
+    if not (stored_chunks > 0 and index_missing):
+        time.sleep(MAINTENANCE_INTERVAL)
+    while True:
+        try:
+            compact_vector_store()
+        except Exception as e:
+            print(f"Vector store maintenance error: {e}")
+        time.sleep(MAINTENANCE_INTERVAL)
     
 def generate_quiz(topic):
     # Search for relevant content in ChromaDB
@@ -428,6 +996,7 @@ def generate_quiz(topic):
         return {"error": "No relevant content found for quiz"}
     
     relevant_text = "\n\n".join([res.page_content for res in filtered_results])
+    touch_sources({get_doc_id(res.metadata) for res in filtered_results})
     
     llm = OllamaLLM(model="llama3.2:3b")
     prompt = f"""
@@ -489,6 +1058,26 @@ def generate_quiz(topic):
     except Exception as e:
         return {"error": f"Failed to generate quiz: {str(e)}"}
 
+def extract_content(file_path, file_name, task_id=None):
+    """Extract the text of a PDF or the transcript of an audio or video file"""
+    if has_extension(file_name, PDF_EXTENSIONS):
+        print("Detected PDF file, extracting text...")
+        update_status(task_id, 0.1, "Extracting text from PDF")
+        transcript = extract_text_from_pdf(file_path, task_id)
+        print(f"Extracted {len(transcript.split())} words from PDF")
+        return transcript
+    elif has_extension(file_name, AUDIO_EXTENSIONS):
+        print("Detected audio file, transcribing...")
+        update_status(task_id, 0.1, "Transcribing audio")
+        return transcribe_audio(file_path, task_id)
+    elif has_extension(file_name, VIDEO_EXTENSIONS):
+        print("Detected video file, extracting audio and transcribing...")
+        update_status(task_id, 0.1, "Extracting audio")
+        audio_file = extract_audio(file_path, task_id, output_dir=os.path.dirname(file_path))
+        update_status(task_id, 0.3, "Transcribing audio")
+        return transcribe_audio(audio_file, task_id)
+    raise ValueError(f"Unsupported file format: {file_name}")
+
 def process_file_background(file_path, file_name, task_id):
     """Process file in background"""
     try:
@@ -507,22 +1096,16 @@ def process_file_background(file_path, file_name, task_id):
             processing_status[task_id]["completed"] = True
             return
         
-        if file_name.endswith(".pdf"):
-            print("Detected PDF file, extracting text...")
-            update_status(task_id, 0.1, "Extracting text from PDF")
-            transcript = extract_text_from_pdf(file_path, task_id)
-            print(f"Extracted {len(transcript.split())} words from PDF")
-        elif file_name.endswith((".mp3", ".wav", ".m4a")):
-            print("Detected audio file, transcribing...")
-            update_status(task_id, 0.1, "Transcribing audio")
-            transcript = transcribe_audio(file_path)
-        elif file_name.endswith((".mp4", ".mkv", ".avi")):
-            print("Detected video file, extracting audio and transcribing...")
-            update_status(task_id, 0.1, "Extracting audio")
-            audio_file = extract_audio(file_path)
-            update_status(task_id, 0.3, "Transcribing audio")
-            transcript = transcribe_audio(audio_file)
-            os.remove(audio_file)  # Clean up extracted audio
+        # Resume from the last checkpoint if this file was processed before
+        checkpoint = load_checkpoint(file_hash)
+        if checkpoint["transcript"]:
+            print("Found checkpoint, resuming after text extraction")
+            transcript = checkpoint["transcript"]
+            update_status(task_id, 0.4, "Resumed from checkpoint")
+        elif has_extension(file_name, SUPPORTED_EXTENSIONS):
+            # Wait for scratch space before writing any derived files
+            reserve_disk(task_id, estimate_derived_bytes(file_path, file_name))
+            transcript = extract_content(file_path, file_name, task_id)
         else:
             update_status(task_id, 1.0, "Error: Unsupported file format")
             processing_status[task_id]["error"] = "Unsupported file format"
@@ -531,18 +1114,23 @@ def process_file_background(file_path, file_name, task_id):
         
         # Generate summary if we have content
         if transcript:
+            if not checkpoint["transcript"]:
+                checkpoint["transcript"] = transcript
+                save_checkpoint(checkpoint)
+            check_cancelled(task_id)
             print(f"Starting to process {len(transcript.split())} words for summarization")
             
             # Store in ChromaDB for quiz generation (in background)
-            store_in_chroma(transcript, source=file_name)
+            store_in_chroma(transcript, file_hash, source=file_name, task_id=task_id)
             
             # Generate optimized summary for large documents
             print("Generating summary...")
-            summary = summarize_large_document_optimized(transcript, task_id)
+            summary = summarize_large_document_optimized(transcript, task_id, checkpoint=checkpoint)
             print(f"Generated summary of {len(summary.split())} words")
             
-            # Cache the result
+            # Cache the result; the checkpoint is no longer needed
             save_to_cache(file_hash, summary)
+            clear_checkpoint(file_hash)
             
             # Store result and mark as complete
             processing_status[task_id]["summary"] = summary
@@ -553,6 +1141,12 @@ def process_file_background(file_path, file_name, task_id):
             processing_status[task_id]["completed"] = True
             update_status(task_id, 1.0, "Error: Failed to extract content")
     
+    except TaskCancelled:
+        # Keep the checkpoint so a retry of the same file resumes from here
+        print(f"Task {task_id} cancelled")
+        processing_status[task_id]["cancelled_at"] = time.time()
+        processing_status[task_id]["completed"] = True
+        update_status(task_id, processing_status[task_id]["progress"], "Cancelled")
     except Exception as e:
         import traceback
         print(f"Exception during processing: {str(e)}")
@@ -561,47 +1155,59 @@ def process_file_background(file_path, file_name, task_id):
         processing_status[task_id]["completed"] = True
         update_status(task_id, 1.0, f"Error: {str(e)}")
     finally:
-        # Clean up the uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        # Clean up the uploaded file and anything derived from it
+        remove_task_workspace(task_id)
+        release_disk(task_id)
 
 # API endpoints
 @app.post("/api/upload")
 async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    # Save the uploaded file to temp directory
-    file_path = os.path.join(TEMP_DIR, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Generate a task ID
-    task_id = str(uuid.uuid4())
-    
-    # Check file hash for cache
-    file_hash = get_file_hash(file_path)
+    # Check file hash for cache before anything is written to scratch space
+    file_hash = await run_in_threadpool(get_stream_hash, file.file)
     cached_result = check_cache(file_hash)
     
     if cached_result:
         # If we have a cached result, return it immediately
         return {"summary": cached_result, "fromCache": True}
-    else:
-        # Initialize status tracker
-        processing_status[task_id] = {
-            "status": "processing",
-            "progress": 0.0,
-            "details": "Initializing",
-            "completed": False
-        }
-        
-        # Start background processing
-        background_tasks.add_task(
-            process_file_background, 
-            file_path, 
-            file.filename, 
-            task_id
+    
+    # Generate a task ID
+    task_id = str(uuid.uuid4())
+    
+    # Initialize status tracker
+    processing_status[task_id] = {
+        "status": "processing",
+        "progress": 0.0,
+        "details": "Initializing",
+        "completed": False
+    }
+    
+    try:
+        # Admit the upload's own bytes before writing them, waiting only briefly;
+        # admission for the derived files happens in the background job
+        await run_in_threadpool(reserve_disk, task_id, get_upload_size(file), UPLOAD_ADMISSION_TIMEOUT)
+        workspace = create_task_workspace(task_id)
+        file_path = os.path.join(workspace, secure_filename(file.filename) or "upload")
+        with open(file_path, "wb") as buffer:
+            await run_in_threadpool(shutil.copyfileobj, file.file, buffer)
+    except Exception as e:
+        remove_task_workspace(task_id)
+        release_disk(task_id)
+        del processing_status[task_id]
+        return JSONResponse(
+            content={"error": f"Failed to store upload: {str(e)}"}, 
+            status_code=507
         )
-        
-        # Return task ID for status checking
-        return {"taskId": task_id, "status": "processing"}
+    
+    # Start background processing
+    background_tasks.add_task(
+        process_file_background, 
+        file_path, 
+        file.filename, 
+        task_id
+    )
+    
+    # Return task ID for status checking
+    return {"taskId": task_id, "status": "processing"}
 
 @app.get("/api/status/{task_id}")
 async def get_status(task_id: str):
@@ -614,12 +1220,40 @@ async def get_status(task_id: str):
     
     status_data = processing_status[task_id]
     
+    # Batch jobs report every file alongside the overall progress
+    if "files" in status_data:
+        if "cancelled_at" in status_data:
+            status = "cancelled"
+        elif "error" in status_data:
+            status = "error"
+        elif status_data.get("completed", False):
+            status = "completed"
+        else:
+            status = "processing"
+        response = {
+            "status": status,
+            "progress": status_data["progress"],
+            "details": status_data["details"],
+            "files": {name: dict(entry) for name, entry in list(status_data["files"].items())}
+        }
+        if "error" in status_data:
+            response["error"] = status_data["error"]
+        return response
+    
     # If processing is complete, return the summary or error
     if status_data.get("completed", False):
-        if "error" in status_data:
-            return {"status": "error", "error": status_data["error"]}
-        else:
+        # A cancel that arrived after the last cancellation point still finishes the job
+        if "summary" in status_data:
             return {"status": "completed", "summary": status_data["summary"]}
+        # Cancelled and failed jobs still hand back whatever they summarized
+        elif "cancelled_at" in status_data:
+            return {"status": "cancelled", "partialSummary": status_data.get("partial_summary", "")}
+        else:
+            return {
+                "status": "error",
+                "error": status_data.get("error", "Unknown error"),
+                "partialSummary": status_data.get("partial_summary", "")
+            }
     
     # Otherwise return progress information
     return {
@@ -628,6 +1262,27 @@ async def get_status(task_id: str):
         "details": status_data["details"]
     }
 
+@app.delete("/api/status/{task_id}")
+async def cancel_task(task_id: str):
+    """Request cancellation of a processing task"""
+    if task_id not in processing_status:
+        return JSONResponse(
+            content={"error": "Task not found"}, 
+            status_code=404
+        )
+    
+    status_data = processing_status[task_id]
+    if status_data.get("completed", False):
+        return JSONResponse(
+            content={"error": "Task already finished"}, 
+            status_code=409
+        )
+    
+    # The background job notices the flag at its next cancellation point
+    status_data["cancelled"] = True
+    update_status(task_id, status_data["progress"], "Cancelling")
+    return {"taskId": task_id, "status": "cancelling"}
+
 @app.post("/api/youtube")
 async def process_youtube(background_tasks: BackgroundTasks, request: YouTubeRequest):
     try:
@@ -660,36 +1315,62 @@ async def process_youtube(background_tasks: BackgroundTasks, request: YouTubeReq
 def process_youtube_background(url, task_id):
     """Process YouTube video in background"""
     try:
-        # Download YouTube video
-        print(f"Downloading YouTube video: {url}")
-        update_status(task_id, 0.1, "Downloading YouTube video")
-        video_path = download_youtube_video(url)
-        
-        # Extract audio and transcribe
-        print("Extracting audio from video...")
-        update_status(task_id, 0.3, "Extracting audio")
-        audio_path = extract_audio(video_path)
-        print("Transcribing audio...")
-        update_status(task_id, 0.5, "Transcribing audio")
-        transcript = transcribe_audio(audio_path)
+        # Resume from the last checkpoint if this video was processed before
+        job_key = "youtube_" + hashlib.md5(url.encode()).hexdigest()
+        checkpoint = load_checkpoint(job_key)
+        
+        if checkpoint["transcript"]:
+            print("Found checkpoint, skipping download and transcription")
+            transcript = checkpoint["transcript"]
+            update_status(task_id, 0.5, "Resumed from checkpoint")
+        else:
+            # Wait for scratch space, then download into the task's workspace.
+            # The video and audio streams are downloaded separately, so each
+            # gets half of the reservation as its size limit.
+            reserve_disk(task_id, YOUTUBE_DISK_ESTIMATE)
+            workspace = create_task_workspace(task_id)
+            print(f"Downloading YouTube video: {url}")
+            update_status(task_id, 0.1, "Downloading YouTube video")
+            video_path = download_youtube_video(
+                url, task_id, output_dir=workspace, max_filesize=YOUTUBE_DISK_ESTIMATE // 2
+            )
+            
+            # Extract audio and transcribe
+            print("Extracting audio from video...")
+            reserve_disk(task_id, estimate_derived_bytes(video_path, video_path))
+            update_status(task_id, 0.3, "Extracting audio")
+            audio_path = extract_audio(video_path, task_id, output_dir=workspace)
+            print("Transcribing audio...")
+            update_status(task_id, 0.5, "Transcribing audio")
+            transcript = transcribe_audio(audio_path, task_id)
+            checkpoint["transcript"] = transcript
+            save_checkpoint(checkpoint)
+            
+            # The media files are no longer needed once transcribed
+            remove_task_workspace(task_id)
+            release_disk(task_id)
+        check_cancelled(task_id)
         
         # Store in ChromaDB for quiz generation
         print("Storing transcript in ChromaDB...")
-        store_in_chroma(transcript, source=f"YouTube: {url}")
+        store_in_chroma(transcript, job_key, source=f"YouTube: {url}", task_id=task_id)
         
         # Generate summary
         print("Generating summary...")
-        summary = summarize_large_document_optimized(transcript, task_id)
+        summary = summarize_large_document_optimized(transcript, task_id, checkpoint=checkpoint)
+        clear_checkpoint(job_key)
         
         # Store result and mark as complete
         processing_status[task_id]["summary"] = summary
         processing_status[task_id]["completed"] = True
         update_status(task_id, 1.0, "Processing complete")
         
-        # Clean up
-        os.remove(video_path)
-        os.remove(audio_path)
-        
+    except TaskCancelled:
+        # Keep the checkpoint so resubmitting the same URL resumes from here
+        print(f"Task {task_id} cancelled")
+        processing_status[task_id]["cancelled_at"] = time.time()
+        processing_status[task_id]["completed"] = True
+        update_status(task_id, processing_status[task_id]["progress"], "Cancelled")
     except Exception as e:
         import traceback
         print(f"Exception during YouTube processing: {str(e)}")
@@ -697,6 +1378,298 @@ def process_youtube_background(url, task_id):
         processing_status[task_id]["error"] = f"Error processing YouTube video: {str(e)}"
         processing_status[task_id]["completed"] = True
         update_status(task_id, 1.0, f"Error: {str(e)}")
+    finally:
+        # Clean up the downloaded video and audio on every exit path
+        remove_task_workspace(task_id)
+        release_disk(task_id)
+
+@app.post("/api/batch_upload")
+async def batch_upload(background_tasks: BackgroundTasks, files: List[UploadFile] = File(...)):
+    """Accept many files or zip archives and process them as one job"""
+    batch_id = str(uuid.uuid4())
+    
+    # Initialize status tracker with per-file progress
+    processing_status[batch_id] = {
+        "status": "processing",
+        "progress": 0.0,
+        "details": "Initializing batch",
+        "completed": False,
+        "files": {}
+    }
+    
+    try:
+        # Admit the uploads' own bytes before writing them, waiting only briefly;
+        # admission for unpacked and derived files happens in the background job
+        await run_in_threadpool(
+            reserve_disk, batch_id, sum(get_upload_size(upload) for upload in files), UPLOAD_ADMISSION_TIMEOUT
+        )
+        workspace = create_task_workspace(batch_id)
+        uploads = []
+        for upload in files:
+            file_path = os.path.join(workspace, f"{uuid.uuid4().hex}_{secure_filename(upload.filename) or 'upload'}")
+            with open(file_path, "wb") as buffer:
+                await run_in_threadpool(shutil.copyfileobj, upload.file, buffer)
+            uploads.append((file_path, upload.filename))
+    except Exception as e:
+        remove_task_workspace(batch_id)
+        release_disk(batch_id)
+        del processing_status[batch_id]
+        return JSONResponse(
+            content={"error": f"Failed to store upload: {str(e)}"}, 
+            status_code=507
+        )
+    
+    # Start background processing
+    background_tasks.add_task(process_batch_background, uploads, batch_id)
+    
+    # Return task ID for status checking
+    return {"taskId": batch_id, "status": "processing", "fileCount": len(uploads)}
+
+def extract_zip_members(zip_path, output_dir, task_id):
+    """Unpack the supported files of a zip archive, returning (path, name) pairs"""
+    members = []
+    with zipfile.ZipFile(zip_path) as archive:
+        infos = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and has_extension(info.filename, SUPPORTED_EXTENSIONS)
+        ]
+        
+        # Grow the task's reservation by the uncompressed size before unpacking;
+        # audio tracks of videos are reserved per file once their duration is known
+        needed = sum(info.file_size for info in infos)
+        if needed > TEMP_DISK_QUOTA:
+            raise Exception("Zip archive is too large to unpack")
+        reserve_disk(task_id, needed)
+        
+        for info in infos:
+            check_cancelled(task_id)
+            member_name = secure_filename(os.path.basename(info.filename)) or "member"
+            member_path = os.path.join(output_dir, f"{uuid.uuid4().hex}_{member_name}")
+            with archive.open(info) as source, open(member_path, "wb") as target:
+                shutil.copyfileobj(source, target)
+            members.append((member_path, info.filename))
+    return members
+
+def get_partial_summary(checkpoint):
+    """Join the chunk summaries a checkpoint holds so far"""
+    chunk_summaries = checkpoint["chunk_summaries"] if checkpoint else {}
+    return " ".join(chunk_summaries[i] for i in sorted(chunk_summaries) if chunk_summaries[i])
+
+def unique_file_key(files, file_name):
+    """Key a batch file by its name, numbering repeats so none overwrite each other"""
+    key = file_name
+    n = 2
+    while key in files:
+        key = f"{file_name} ({n})"
+        n += 1
+    return key
+
+def process_batch_background(uploads, batch_id):
+    """
+    Process a batch of files in background. Files are deduplicated by
+    content hash and extracted in parallel, then the chunks of all files
+    are pooled so the summarizer and embedding model run full batches.
+    Each file checkpoints under its content hash like a single upload.
+    """
+    files = processing_status[batch_id]["files"]
+    subtask_ids = []
+    documents = {}
+    checkpoints = {}
+    try:
+        update_status(batch_id, 0.0, "Unpacking uploads")
+        
+        # Expand zip archives into their member files; a bad archive only fails itself
+        entries = []
+        for file_path, file_name in uploads:
+            if not has_extension(file_name, ".zip"):
+                entries.append((file_path, file_name))
+                continue
+            try:
+                entries.extend(extract_zip_members(file_path, os.path.dirname(file_path), batch_id))
+            except TaskCancelled:
+                raise
+            except Exception as e:
+                print(f"Failed to unpack {file_name}: {str(e)}")
+                files[unique_file_key(files, file_name)] = {
+                    "status": "error",
+                    "error": f"Failed to unpack archive: {str(e)}"
+                }
+            os.remove(file_path)
+        
+        # Deduplicate by content hash, answering cached files right away
+        seen_hashes = {}
+        for file_path, file_name in entries:
+            check_cancelled(batch_id)
+            key = unique_file_key(files, file_name)
+            file_hash = get_file_hash(file_path)
+            if file_hash in seen_hashes:
+                files[key] = {"status": "duplicate", "duplicateOf": seen_hashes[file_hash]}
+                continue
+            seen_hashes[file_hash] = key
+            
+            if not has_extension(file_name, SUPPORTED_EXTENSIONS):
+                files[key] = {"status": "error", "error": "Unsupported file format"}
+                continue
+            cached_result = check_cache(file_hash)
+            if cached_result:
+                files[key] = {"status": "completed", "summary": cached_result, "fromCache": True}
+                continue
+            documents[file_hash] = (file_path, file_name, key)
+            files[key] = {"status": "extracting", "progress": 0.0, "details": "Queued"}
+        
+        # Resume files whose transcript was checkpointed by an earlier run
+        checkpoints.update({file_hash: load_checkpoint(file_hash) for file_hash in documents})
+        transcripts = {}
+        for file_hash, checkpoint in checkpoints.items():
+            if checkpoint["transcript"]:
+                transcripts[file_hash] = checkpoint["transcript"]
+                files[documents[file_hash][2]] = {
+                    "status": "summarizing", "progress": 0.5, "details": "Resumed from checkpoint"
+                }
+        to_extract = [file_hash for file_hash in documents if file_hash not in transcripts]
+        
+        # Wait for scratch space for the files the extraction derives
+        reserve_disk(batch_id, sum(
+            estimate_derived_bytes(documents[file_hash][0], documents[file_hash][1])
+            for file_hash in to_extract
+        ))
+        
+        # Extract and transcribe the remaining files in parallel. Each file runs
+        # under a subtask of the batch so cancelling the batch stops it mid-file.
+        update_status(batch_id, 0.1, f"Extracting {len(to_extract)} files")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_EXTRACT_WORKERS) as executor:
+            future_to_hash = {}
+            for file_hash in to_extract:
+                file_path, file_name, key = documents[file_hash]
+                subtask_id = f"{batch_id}:{file_hash}"
+                processing_status[subtask_id] = {
+                    "progress": 0.0,
+                    "details": "Queued",
+                    "completed": False,
+                    "parent": batch_id,
+                    "file_key": key
+                }
+                subtask_ids.append(subtask_id)
+                future_to_hash[executor.submit(extract_content, file_path, file_name, subtask_id)] = file_hash
+            
+            for n, future in enumerate(concurrent.futures.as_completed(future_to_hash), 1):
+                file_hash = future_to_hash[future]
+                key = documents[file_hash][2]
+                try:
+                    transcript = future.result()
+                    if transcript:
+                        transcripts[file_hash] = transcript
+                        checkpoints[file_hash]["transcript"] = transcript
+                        save_checkpoint(checkpoints[file_hash])
+                        files[key] = {"status": "summarizing", "progress": 0.5, "details": "Waiting for summarization"}
+                    else:
+                        files[key] = {"status": "error", "error": "Failed to extract content from file"}
+                except TaskCancelled:
+                    pass
+                except Exception as e:
+                    print(f"Extraction error for {key}: {str(e)}")
+                    files[key] = {"status": "error", "error": f"Processing error: {str(e)}"}
+                
+                update_status(batch_id, 0.1 + (n / len(to_extract) * 0.3), f"Extracted {n}/{len(to_extract)} files")
+                if is_cancelled(batch_id):
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise TaskCancelled()
+        
+        # Store the chunks of every file in ChromaDB with shared embedding calls.
+        # Chunk IDs are content-derived, so a resumed batch skips chunks already stored.
+        items = [
+            (file_hash, documents[file_hash][1], chunk)
+            for file_hash, transcript in transcripts.items()
+            for chunk in split_for_embedding(transcript)
+        ]
+        added = {}
+        for i in range(0, len(items), EMBED_BATCH_SIZE):
+            check_cancelled(batch_id)
+            for file_hash, count in add_chunk_batch(items[i:i + EMBED_BATCH_SIZE]).items():
+                added[file_hash] = added.get(file_hash, 0) + count
+            update_status(batch_id, 0.4 + (i / len(items) * 0.1), f"Embedded {i}/{len(items)} chunks")
+        vector_store.persist()
+        for file_hash in transcripts:
+            register_source(file_hash, documents[file_hash][1], added.get(file_hash, 0))
+        apply_retention(protect=set(transcripts))
+        
+        # Pool the chunks of every file into shared summarizer batches, skipping
+        # chunks summarized before a crash. Sorting by length batches similar
+        # chunks together and keeps padding low.
+        summary_chunks = {file_hash: split_for_summary(transcript) for file_hash, transcript in transcripts.items()}
+        pooled = [
+            (file_hash, i, chunk)
+            for file_hash, chunks in summary_chunks.items()
+            for i, chunk in enumerate(chunks)
+            if i not in checkpoints[file_hash]["chunk_summaries"]
+        ]
+        pooled.sort(key=lambda item: len(item[2]))
+        for i in range(0, len(pooled), SUMMARY_BATCH_SIZE):
+            check_cancelled(batch_id)
+            batch = pooled[i:i + SUMMARY_BATCH_SIZE]
+            summaries = summarize_chunk_batch([chunk for _, _, chunk in batch])
+            for (file_hash, chunk_idx, _), summary in zip(batch, summaries):
+                checkpoints[file_hash]["chunk_summaries"][chunk_idx] = summary
+            for file_hash in {file_hash for file_hash, _, _ in batch}:
+                save_checkpoint(checkpoints[file_hash])
+                summarized = len(checkpoints[file_hash]["chunk_summaries"])
+                total = len(summary_chunks[file_hash])
+                files[documents[file_hash][2]].update(
+                    progress=0.5 + (summarized / total * 0.4),
+                    details=f"Summarized {summarized}/{total} chunks"
+                )
+            done = min(i + SUMMARY_BATCH_SIZE, len(pooled))
+            update_status(batch_id, 0.5 + (done / len(pooled) * 0.4), f"Summarized {done}/{len(pooled)} chunks")
+        
+        # Build each file's final summary from its own chunk summaries
+        update_status(batch_id, 0.9, "Creating final summaries")
+        for file_hash in transcripts:
+            check_cancelled(batch_id)
+            key = documents[file_hash][2]
+            summaries_by_idx = checkpoints[file_hash]["chunk_summaries"]
+            summary = combine_chunk_summaries([
+                summaries_by_idx[i] for i in sorted(summaries_by_idx) if summaries_by_idx[i]
+            ])
+            save_to_cache(file_hash, summary)
+            clear_checkpoint(file_hash)
+            files[key] = {"status": "completed", "progress": 1.0, "summary": summary}
+        
+        processing_status[batch_id]["completed"] = True
+        update_status(batch_id, 1.0, f"Processed {len(files)} files")
+    
+    except TaskCancelled:
+        # Files that already finished keep their summaries; the rest keep their
+        # checkpoints and hand back whatever they summarized so far
+        print(f"Batch {batch_id} cancelled")
+        processing_status[batch_id]["cancelled_at"] = time.time()
+        for file_hash, (_, _, key) in documents.items():
+            entry = files[key]
+            if entry["status"] in ("extracting", "summarizing"):
+                entry["status"] = "cancelled"
+                entry["partialSummary"] = get_partial_summary(checkpoints.get(file_hash))
+        processing_status[batch_id]["completed"] = True
+        update_status(batch_id, processing_status[batch_id]["progress"], "Cancelled")
+    except Exception as e:
+        import traceback
+        print(f"Exception during batch processing: {str(e)}")
+        print(traceback.format_exc())
+        for file_hash, (_, _, key) in documents.items():
+            entry = files[key]
+            if entry["status"] in ("extracting", "summarizing"):
+                entry["status"] = "error"
+                entry["error"] = f"Batch processing error: {str(e)}"
+                entry["partialSummary"] = get_partial_summary(checkpoints.get(file_hash))
+        processing_status[batch_id]["error"] = f"Batch processing error: {str(e)}"
+        processing_status[batch_id]["completed"] = True
+        update_status(batch_id, 1.0, f"Error: {str(e)}")
+    finally:
+        # Clean up the uploaded files and anything derived from them
+        for subtask_id in subtask_ids:
+            processing_status.pop(subtask_id, None)
+        remove_task_workspace(batch_id)
+        release_disk(batch_id)
 
 @app.post("/api/generate_quiz")
 async def generate_quiz_endpoint(topic: str = Form(...)):
@@ -728,8 +1701,55 @@ async def generate_quiz_endpoint(topic: str = Form(...)):
             status_code=500
         )
 
+@app.get("/api/vector_store/stats")
+async def vector_store_stats():
+    """Report vector store size from cheap counts and the source index"""
+    with source_index_lock:
+        sources = {
+            doc_id: {
+                "source": entry["source"],
+                "chunks": entry["chunks"],
+                "addedAt": entry["added_at"],
+                "lastUsed": entry["last_used"]
+            }
+            for doc_id, entry in source_index.items()
+        }
+    return {
+        "chunks": vector_store._collection.count(),
+        "maxChunks": MAX_VECTOR_CHUNKS,
+        "ttlDays": VECTOR_TTL_DAYS,
+        "sources": sources
+    }
+
+@app.delete("/api/vector_store/sources/{source_id}")
+async def delete_vector_source(source_id: str):
+    """Delete every stored chunk for a source, by the ID listed in the stats"""
+    with source_index_lock:
+        if source_id not in source_index:
+            return JSONResponse(content={"error": "Source not found"}, status_code=404)
+    removed = await run_in_threadpool(delete_source, source_id)
+    return {"sourceId": source_id, "deleted": removed}
+
+@app.post("/api/vector_store/compact")
+async def compact_vector_store_endpoint(background_tasks: BackgroundTasks):
+    """Deduplicate and apply retention to the vector store in the background"""
+    background_tasks.add_task(compact_vector_store)
+    return {"status": "scheduled"}
+
+@app.on_event("startup")
+def start_sweeper():
+    """Clear scratch files left over by crashed runs and keep sweeping periodically"""
+    threading.Thread(target=run_sweeper, daemon=True).start()
+
+@app.on_event("startup")
+def start_vector_maintenance():
+    """Deduplicate and prune the vector store in the background, then periodically"""
+    with source_index_lock:
+        migrate_source_index()
+    threading.Thread(target=run_vector_maintenance, daemon=True).start()
+
 # Run the app
 if __name__ == "__main__":
     import uvicorn
     print("Starting Quizzora backend server...")
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file